@@ -1,44 +1,86 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from core.mcp_protocol import mcp
 from core.document_parser import DocumentParser
 
+def _parse_file(parser: DocumentParser, file_path: str, cache_key: Optional[str] = None) -> Dict[str, Any]:
+    """Parse a single document, returning an error document instead of raising"""
+    try:
+        print(f"📄 Processing: {os.path.basename(file_path)}")
+        
+        parsed_doc = parser.parse_document(file_path, cache_key)
+        
+        print(f"✅ Processed {parsed_doc['filename']}: {len(parsed_doc['chunks'])} chunks")
+        return parsed_doc
+        
+    except Exception as e:
+        print(f"❌ Error processing {file_path}: {str(e)}")
+        return {
+            'filename': os.path.basename(file_path),
+            'content': f"Error: {str(e)}",
+            'chunks': [],
+            'metadata': {'error': str(e)}
+        }
+
+def _default_workers() -> int:
+    """Number of parser processes, overridable via INGEST_WORKERS"""
+    return max(1, int(os.environ.get("INGEST_WORKERS", (os.cpu_count() or 2) - 1)))
+
 class IngestionAgent:
     """Agent responsible for parsing and preprocessing documents"""
     
     def __init__(self):
         self.name = "IngestionAgent"
         self.parser = DocumentParser()
-        self.processed_documents = []
+        self.processed_documents = []  # Per-document summaries for stats
+        self.batches: Dict[str, List[Dict[str, Any]]] = {}  # Parsed batches awaiting retrieval
+        self._pool: Optional[ProcessPoolExecutor] = None  # Started on first multi-file batch
     
     def process_documents(self, file_paths: List[str], trace_id: str) -> List[Dict[str, Any]]:
         """Process multiple documents and return parsed content"""
         print(f"🔄 {self.name}: Starting document processing...")
         
-        processed_docs = []
+        # Reuse earlier parses of identical files; only parse the rest.
+        # Each file is hashed once and its key reused for parsing and caching.
+        cache_keys = [self._cache_key(file_path) for file_path in file_paths]
+        processed_docs = [self._get_cached(path, key) for path, key in zip(file_paths, cache_keys)]
+        pending = [i for i, doc in enumerate(processed_docs) if doc is None]
+        workers = min(_default_workers(), len(pending))
         
-        for file_path in file_paths:
+        if workers <= 1:
+            # Skip pool start-up cost for a single document
+            for i in pending:
+                processed_docs[i] = _parse_file(self.parser, file_paths[i], cache_keys[i])
+        elif pending:
+            # Parsing is CPU-bound, so fan documents out across processes.
+            # map() keeps results in submission order.
+            pending_paths = [file_paths[i] for i in pending]
+            pending_keys = [cache_keys[i] for i in pending]
             try:
-                print(f"📄 Processing: {os.path.basename(file_path)}")
-                
-                # Parse document
-                parsed_doc = self.parser.parse_document(file_path)
-                processed_docs.append(parsed_doc)
-                
-                print(f"✅ Processed {parsed_doc['filename']}: {len(parsed_doc['chunks'])} chunks")
-                
-            except Exception as e:
-                print(f"❌ Error processing {file_path}: {str(e)}")
-                # Add error document
-                processed_docs.append({
-                    'filename': os.path.basename(file_path),
-                    'content': f"Error: {str(e)}",
-                    'chunks': [],
-                    'metadata': {'error': str(e)}
-                })
+                parsed = self._get_pool().map(_parse_file, [self.parser] * len(pending_paths), pending_paths, pending_keys)
+                for i, parsed_doc in zip(pending, parsed):
+                    processed_docs[i] = parsed_doc
+                    if cache_keys[i] is not None:
+                        self.parser.cache_document(file_paths[i], parsed_doc, cache_keys[i])
+            except BrokenProcessPool:
+                # A crashed worker breaks the whole pool; start a fresh one next time
+                self._pool = None
+                raise
         
-        # Store processed documents
-        self.processed_documents.extend(processed_docs)
+        # Keep only summaries for stats; the full batch is parked until RetrievalAgent takes it
+        self.processed_documents.extend(
+            {
+                'filename': doc['filename'],
+                'total_chunks': len(doc['chunks']),
+                'metadata': doc['metadata']
+            }
+            for doc in processed_docs
+        )
+        batch_id = trace_id
+        self.batches[batch_id] = processed_docs
         
         # Send MCP message to RetrievalAgent
         mcp.send_message(
@@ -47,7 +89,7 @@ class IngestionAgent:
             message_type="INGESTION_COMPLETE",
             trace_id=trace_id,
             payload={
-                "processed_documents": processed_docs,
+                "batch_id": batch_id,
                 "total_documents": len(processed_docs),
                 "total_chunks": sum(len(doc['chunks']) for doc in processed_docs)
             }
@@ -56,13 +98,48 @@ class IngestionAgent:
         print(f"✅ {self.name}: Processing complete. Sent to RetrievalAgent")
         return processed_docs
     
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Parser processes, started once and reused across batches.
+        
+        Workers are spawned rather than forked, as the server process already
+        runs model and UI threads; spawning re-imports the parsing stack, so
+        that cost is paid once instead of on every batch.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=_default_workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+    
+    def take_batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Hand over a parsed batch, releasing this agent's reference to it"""
+        return self.batches.pop(batch_id, [])
+    
+    def _cache_key(self, file_path: str) -> Optional[str]:
+        """Content hash of the file, or None if it cannot be read"""
+        try:
+            return self.parser.cache_key(file_path)
+        except OSError:
+            return None
+    
+    def _get_cached(self, file_path: str, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Look up a previously parsed copy of the file"""
+        if cache_key is None:
+            return None
+        
+        cached = self.parser.get_cached(file_path, cache_key)
+        if cached is not None:
+            print(f"♻️ Reusing cached parse: {os.path.basename(file_path)}")
+        return cached
+    
     def get_supported_formats(self) -> List[str]:
         """Get list of supported file formats"""
         return list(self.parser.supported_formats)
     
     def get_processing_stats(self) -> Dict[str, Any]:
         """Get statistics about processed documents"""
-        total_chunks = sum(len(doc['chunks']) for doc in self.processed_documents)
+        total_chunks = sum(doc['total_chunks'] for doc in self.processed_documents)
         formats = {}
         
         for doc in self.processed_documents:
@@ -3,7 +3,7 @@ import os
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
-from core.mcp_protocol import mcp
+from core.mcp_protocol import mcp, RECEIVE_TIMEOUT
 
 # Load environment variables
 load_dotenv()
@@ -21,7 +21,7 @@ class LLMResponseAgent:
         print(f"🤖 {self.name}: Generating response for query: '{query}'")
         
         # Wait for context from RetrievalAgent
-        message = mcp.receive_message(self.name)
+        message = mcp.receive_message(self.name, timeout=RECEIVE_TIMEOUT, trace_id=trace_id)
         
         if not message or message.type != "CONTEXT_RESPONSE":
             print(f"❌ {self.name}: No context received from RetrievalAgent")
@@ -34,13 +34,15 @@ class LLMResponseAgent:
         retrieved_context = message.payload["retrieved_context"]
         
         # Build context from retrieved chunks
-        context_text = ""
+        context_parts = []
         sources = []
         
         for i, chunk in enumerate(retrieved_context):
-            context_text += f"Document: {chunk['filename']}\n"
-            context_text += f"Content: {chunk['text']}\n"
-            context_text += f"Relevance Score: {chunk['score']:.3f}\n\n"
+            context_parts.append(
+                f"Document: {chunk['filename']}\n"
+                f"Content: {chunk['text']}\n"
+                f"Relevance Score: {chunk['score']:.3f}\n\n"
+            )
             
             sources.append({
                 "filename": chunk["filename"],
@@ -49,6 +51,8 @@ class LLMResponseAgent:
                 "preview": chunk["text"][:150] + "..." if len(chunk["text"]) > 150 else chunk["text"]
             })
         
+        context_text = "".join(context_parts)
+        
         # Create prompt for Gemini
         prompt = f"""You are a helpful AI assistant that answers questions based on provided document context.
 
@@ -79,13 +83,14 @@ Answer:"""
                 response_mime_type="text/plain",
             )
             
-            response_text = ""
+            response_parts: List[str] = []
             for chunk in self.client.models.generate_content_stream(
                 model=self.model,
                 contents=contents,
                 config=generate_content_config,
             ):
-                response_text += chunk.text
+                response_parts.append(chunk.text)
+            response_text = "".join(response_parts)
             
             print(f"✅ {self.name}: Response generated successfully")
             
@@ -139,13 +144,13 @@ Answer:"""
                 response_mime_type="text/plain",
             )
             
-            response_text = ""
+            response_parts: List[str] = []
             for chunk in self.client.models.generate_content_stream(
                 model=self.model,
                 contents=contents,
                 config=generate_content_config,
             ):
-                response_text += chunk.text
+                response_parts.append(chunk.text)
                 break  # Just test the first chunk
             
             print(f"✅ {self.name}: Gemini API connection successful")
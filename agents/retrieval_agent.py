@@ -1,26 +1,44 @@
 from typing import List, Dict, Any
-from core.mcp_protocol import mcp
+import os
+import numpy as np
+from core.mcp_protocol import mcp, RECEIVE_TIMEOUT
 from core.vector_store import VectorStore
+from agents.ingestion_agent import IngestionAgent
 
 class RetrievalAgent:
     """Agent responsible for embedding and semantic retrieval"""
     
-    def __init__(self):
+    def __init__(self, ingestion_agent: IngestionAgent):
         self.name = "RetrievalAgent"
+        self.ingestion_agent = ingestion_agent
         self.vector_store = VectorStore()
         self.is_initialized = False
+        self.persist_dir = os.environ.get("VECTOR_STORE_DIR", "vector_store")
+    
+    def load_vector_store(self) -> bool:
+        """Restore a previously saved vector store instead of re-embedding"""
+        try:
+            documents = self.vector_store.load(self.persist_dir)
+            self.is_initialized = documents is not None
+            if self.is_initialized:
+                self.ingestion_agent.processed_documents = documents
+        except Exception as e:
+            print(f"❌ {self.name}: Could not load saved vector store: {str(e)}")
+            self.vector_store.clear()
+            self.is_initialized = False
+        return self.is_initialized
     
     def process_ingestion_message(self, trace_id: str):
         """Process ingestion complete message and build vector store"""
         print(f"🔄 {self.name}: Waiting for ingestion message...")
         
         # Check for message from IngestionAgent
-        message = mcp.receive_message(self.name)
+        message = mcp.receive_message(self.name, timeout=RECEIVE_TIMEOUT, trace_id=trace_id)
         
         if message and message.type == "INGESTION_COMPLETE":
             print(f"📨 {self.name}: Received ingestion complete message")
             
-            processed_documents = message.payload["processed_documents"]
+            processed_documents = self.ingestion_agent.take_batch(message.payload["batch_id"])
             
             # Build vector store
             self.vector_store.add_documents(processed_documents)
@@ -43,6 +61,13 @@ class RetrievalAgent:
             return True
         return False
     
+    def save_vector_store(self):
+        """Persist the vector store; this is best effort and never fails ingestion"""
+        try:
+            self.vector_store.save(self.persist_dir, self.ingestion_agent.processed_documents)
+        except Exception as e:
+            print(f"⚠️ {self.name}: Could not save vector store: {str(e)}")
+    
     def search_documents(self, query: str, top_k: int = 5, trace_id: str = None) -> List[Dict[str, Any]]:
         """Search for relevant document chunks"""
         if not self.is_initialized:
@@ -54,6 +79,27 @@ class RetrievalAgent:
         # Perform semantic search
         results = self.vector_store.search(query, top_k=top_k)
         
+        return self._publish_results(query, results, trace_id)
+    
+    def search_documents_batch(self, queries: List[str], top_k: int = 5, trace_ids: List[str] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries at once, sending one context message per trace"""
+        if not self.is_initialized:
+            print(f"❌ {self.name}: Vector store not initialized")
+            return [[] for _ in queries]
+        
+        print(f"🔍 {self.name}: Searching for {len(queries)} queries")
+        
+        # One batched embedding call and FAISS search for all queries
+        batch_results = self.vector_store.search_batch(queries, top_k=top_k)
+        trace_ids = trace_ids or [None] * len(queries)
+        
+        return [
+            self._publish_results(query, results, trace_id)
+            for query, results, trace_id in zip(queries, batch_results, trace_ids)
+        ]
+    
+    def _publish_results(self, query: str, results: List[Dict[str, Any]], trace_id: str = None) -> List[Dict[str, Any]]:
+        """Format search results and send them to LLMResponseAgent"""
         # Format results for MCP message
         retrieved_chunks = []
         for result in results:
@@ -83,6 +129,10 @@ class RetrievalAgent:
         
         return retrieved_chunks
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """Normalized embedding of a query, shared with the search cache"""
+        return self.vector_store.embed_query(query)
+    
     def get_vector_store_stats(self) -> Dict[str, Any]:
         """Get vector store statistics"""
         if self.is_initialized:
@@ -92,5 +142,6 @@ class RetrievalAgent:
     def clear_vector_store(self):
         """Clear the vector store"""
         self.vector_store.clear()
+        self.vector_store.remove_saved(self.persist_dir)
         self.is_initialized = False
         print(f"🗑️ {self.name}: Vector store cleared") 
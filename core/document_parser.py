@@ -1,38 +1,124 @@
 import os
-from typing import List, Dict, Any
+import hashlib
+import zipfile
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
 # Document processing imports
-import PyPDF2
+import fitz  # PyMuPDF
 from pptx import Presentation
-from docx import Document
+from lxml import etree
 import pandas as pd
+import numpy as np
+from numba import njit
+
+# WordprocessingML elements read from .docx files; text tags are only
+# matched as children of a run (w:r), not e.g. tab stops in w:pPr
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_RUN = W_NS + "r"
+W_TEXT_TAGS = {W_NS + "t": None, W_NS + "tab": "\t", W_NS + "br": "\n", W_NS + "cr": "\n"}
+
+@njit(cache=True)
+def _is_space(codepoint: int) -> bool:
+    """Match str.isspace() for a single code point"""
+    return (
+        9 <= codepoint <= 13 or 28 <= codepoint <= 32 or codepoint == 133 or codepoint == 160
+        or codepoint == 5760 or 8192 <= codepoint <= 8202 or codepoint == 8232 or codepoint == 8233
+        or codepoint == 8239 or codepoint == 8287 or codepoint == 12288
+    )
+
+@njit(cache=True)
+def _word_bounds(codepoints: np.ndarray):
+    """Return start and end character offsets of every whitespace-separated word"""
+    # Count words first so the offset arrays are sized by words, not characters
+    num_words = 0
+    in_word = False
+    for i in range(len(codepoints)):
+        if _is_space(codepoints[i]):
+            in_word = False
+        elif not in_word:
+            num_words += 1
+            in_word = True
+    
+    starts = np.empty(num_words, dtype=np.int32)
+    ends = np.empty(num_words, dtype=np.int32)
+    count = 0
+    in_word = False
+    
+    for i in range(len(codepoints)):
+        if _is_space(codepoints[i]):
+            if in_word:
+                ends[count] = i
+                count += 1
+                in_word = False
+        elif not in_word:
+            starts[count] = i
+            in_word = True
+    
+    if in_word:
+        ends[count] = len(codepoints)
+        count += 1
+    
+    return starts, ends
+
+@njit(cache=True)
+def _chunk_bounds(word_starts: np.ndarray, word_ends: np.ndarray, chunk_size: int, overlap: int):
+    """Return character offsets of overlapping chunks of chunk_size words"""
+    num_words = len(word_starts)
+    step = chunk_size - overlap
+    num_chunks = (num_words + step - 1) // step
+    starts = np.empty(num_chunks, dtype=np.int32)
+    ends = np.empty(num_chunks, dtype=np.int32)
+    
+    for k in range(num_chunks):
+        first = k * step
+        starts[k] = word_starts[first]
+        ends[k] = word_ends[min(first + chunk_size, num_words) - 1]
+    
+    return starts, ends
 
 class DocumentParser:
     """Handles parsing of multiple document formats"""
     
+    CACHE_SIZE = 64
+    HASH_BLOCK = 1024 * 1024  # Bytes hashed from each end of large files
+    
     def __init__(self):
         self.supported_formats = {'.pdf', '.pptx', '.docx', '.csv', '.txt', '.md'}
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    def __getstate__(self):
+        # Worker processes start with an empty cache; results are cached by the caller
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
     
-    def parse_document(self, file_path: str) -> Dict[str, Any]:
-        """Parse document based on file extension"""
+    def parse_document(self, file_path: str, cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """Parse document based on file extension, reusing cached results for identical files"""
         file_path = Path(file_path)
         extension = file_path.suffix.lower()
         
         if extension not in self.supported_formats:
             raise ValueError(f"Unsupported file format: {extension}")
         
+        if cache_key is None:
+            cache_key = self.cache_key(file_path)
+        cached = self.get_cached(file_path, cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             if extension == '.pdf':
-                return self._parse_pdf(file_path)
+                parsed_doc = self._parse_pdf(file_path)
             elif extension == '.pptx':
-                return self._parse_pptx(file_path)
+                parsed_doc = self._parse_pptx(file_path)
             elif extension == '.docx':
-                return self._parse_docx(file_path)
+                parsed_doc = self._parse_docx(file_path)
             elif extension == '.csv':
-                return self._parse_csv(file_path)
+                parsed_doc = self._parse_csv(file_path)
             elif extension in ['.txt', '.md']:
-                return self._parse_text(file_path)
+                parsed_doc = self._parse_text(file_path)
         except Exception as e:
             return {
                 'filename': file_path.name,
@@ -40,15 +126,57 @@ class DocumentParser:
                 'chunks': [],
                 'metadata': {'error': str(e)}
             }
+        
+        self.cache_document(file_path, parsed_doc, cache_key)
+        return parsed_doc
+    
+    def get_cached(self, file_path: str, cache_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the cached parse of a file with identical content, if any"""
+        file_path = Path(file_path)
+        key = cache_key or self.cache_key(file_path)
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        
+        self._cache.move_to_end(key)
+        return {**cached, 'filename': file_path.name}
+    
+    def cache_document(self, file_path: str, parsed_doc: Dict[str, Any], cache_key: Optional[str] = None):
+        """Cache a successfully parsed document under its content hash"""
+        if 'error' in parsed_doc['metadata']:
+            return
+        
+        key = cache_key or self.cache_key(file_path)
+        self._cache[key] = parsed_doc
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def cache_key(self, file_path: str) -> str:
+        """Hash file content, sampling only the head and tail of large files"""
+        file_path = Path(file_path)
+        size = file_path.stat().st_size
+        digest = hashlib.sha1(f"{file_path.suffix.lower()}:{size}:".encode())
+        
+        with open(file_path, 'rb') as file:
+            if size <= 2 * self.HASH_BLOCK:
+                digest.update(file.read())
+            else:
+                digest.update(file.read(self.HASH_BLOCK))
+                file.seek(-self.HASH_BLOCK, os.SEEK_END)
+                digest.update(file.read(self.HASH_BLOCK))
+        
+        return digest.hexdigest()
     
     def _parse_pdf(self, file_path: Path) -> Dict[str, Any]:
         """Parse PDF files"""
-        content = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page_num, page in enumerate(pdf_reader.pages):
-                text = page.extract_text()
-                content += f"\n--- Page {page_num + 1} ---\n{text}\n"
+        with fitz.open(file_path) as pdf:
+            parts = [
+                f"\n--- Page {page_num + 1} ---\n{page.get_text('text')}\n"
+                for page_num, page in enumerate(pdf)
+            ]
+            page_count = pdf.page_count
+        content = "".join(parts)
         
         chunks = self._create_chunks(content)
         
@@ -58,23 +186,23 @@ class DocumentParser:
             'chunks': chunks,
             'metadata': {
                 'format': 'pdf',
-                'pages': len(pdf_reader.pages)
+                'pages': page_count
             }
         }
     
     def _parse_pptx(self, file_path: Path) -> Dict[str, Any]:
         """Parse PowerPoint files"""
-        content = ""
+        parts = []
         prs = Presentation(file_path)
         
         for slide_num, slide in enumerate(prs.slides):
-            slide_content = f"\n--- Slide {slide_num + 1} ---\n"
+            parts.append(f"\n--- Slide {slide_num + 1} ---\n")
             
             for shape in slide.shapes:
                 if hasattr(shape, "text") and shape.text:
-                    slide_content += shape.text + "\n"
-            
-            content += slide_content
+                    parts.append(shape.text + "\n")
+        
+        content = "".join(parts)
         
         chunks = self._create_chunks(content)
         
@@ -90,12 +218,28 @@ class DocumentParser:
     
     def _parse_docx(self, file_path: Path) -> Dict[str, Any]:
         """Parse Word documents"""
-        doc = Document(file_path)
-        content = ""
+        parts = []
+        paragraph_count = 0
+        
+        # Stream paragraphs straight from the document XML instead of
+        # building python-docx wrapper objects for each one
+        with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+            for _, paragraph in etree.iterparse(xml, tag=W_NS + "p"):
+                paragraph_count += 1
+                text = "".join(
+                    (element.text or "") if W_TEXT_TAGS[element.tag] is None else W_TEXT_TAGS[element.tag]
+                    for run in paragraph.iter(W_RUN)
+                    for element in run.iterchildren(*W_TEXT_TAGS)
+                )
+                if text.strip():
+                    parts.append(text + "\n")
+                
+                # Free the paragraph and everything already processed before it
+                paragraph.clear()
+                while paragraph.getprevious() is not None:
+                    del paragraph.getparent()[0]
         
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                content += paragraph.text + "\n"
+        content = "".join(parts)
         
         chunks = self._create_chunks(content)
         
@@ -105,7 +249,7 @@ class DocumentParser:
             'chunks': chunks,
             'metadata': {
                 'format': 'docx',
-                'paragraphs': len(doc.paragraphs)
+                'paragraphs': paragraph_count
             }
         }
     
@@ -123,11 +267,16 @@ class DocumentParser:
             content += "Sample Data:\n"
             content += df.head(10).to_string(index=False)
             
-            # Create chunks from each row
+            # Create chunks from each row, building whole columns at once
+            # instead of walking rows with iterrows()
             chunks = []
-            for idx, row in df.iterrows():
-                row_text = f"Row {idx + 1}: " + ", ".join([f"{col}: {val}" for col, val in row.items()])
-                chunks.append(row_text)
+            if len(df.columns) and len(df):
+                row_text = "Row " + pd.Series(df.index + 1, index=df.index).astype(str) + ": "
+                for i, col in enumerate(df.columns):
+                    separator = "" if i == 0 else ", "
+                    values = pd.Series(df[col].to_numpy().astype(str), index=df.index)
+                    row_text = row_text + f"{separator}{col}: " + values
+                chunks = row_text.tolist()
             
             return {
                 'filename': file_path.name,
@@ -169,12 +318,10 @@ class DocumentParser:
         if not content.strip():
             return []
         
-        words = content.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            if chunk.strip():
-                chunks.append(chunk.strip())
+        # Scan word boundaries in compiled code over the UTF-32 code points
+        # (one element per character), then slice the source string
+        codepoints = np.frombuffer(content.encode('utf-32-le'), dtype=np.uint32)
+        word_starts, word_ends = _word_bounds(codepoints)
+        starts, ends = _chunk_bounds(word_starts, word_ends, chunk_size, overlap)
         
-        return chunks 
+        return [content[start:end] for start, end in zip(starts.tolist(), ends.tolist())] 
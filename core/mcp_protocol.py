@@ -1,12 +1,17 @@
-from pydantic import BaseModel
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 import asyncio
 from datetime import datetime
 import json
+import threading
+from collections import defaultdict, deque
 
-class MCPMessage(BaseModel):
+@dataclass
+class MCPMessage:
     """Model Context Protocol Message Structure"""
+    __slots__ = ('sender', 'receiver', 'type', 'trace_id', 'timestamp', 'payload')
+    
     sender: str
     receiver: str
     type: str
@@ -14,13 +19,22 @@ class MCPMessage(BaseModel):
     timestamp: str
     payload: Dict[str, Any]
 
+# Number of most recent messages kept for debugging
+HISTORY_SIZE = 1000
+
+# Seconds an agent waits for an expected message before giving up
+RECEIVE_TIMEOUT = 5.0
+
 class MCPProtocol:
     """In-memory message passing system for agents"""
     
     def __init__(self):
-        self.message_queue = []
-        self.message_history = []
+        self.message_queue: Dict[str, deque] = defaultdict(deque)  # Pending messages per receiver
+        self.message_history: deque = deque(maxlen=HISTORY_SIZE)
         self.current_trace_id = None
+        self._lock = threading.Lock()
+        # One condition per receiver, all sharing the queue lock
+        self._conditions: Dict[str, threading.Condition] = defaultdict(lambda: threading.Condition(self._lock))
     
     def generate_trace_id(self) -> str:
         """Generate unique trace ID for message tracking"""
@@ -40,33 +54,52 @@ class MCPProtocol:
             payload=payload
         )
         
-        # Store in history
-        self.message_history.append(message)
-        
-        # Add to queue
-        self.message_queue.append(message)
+        with self._lock:
+            # Store in history
+            self.message_history.append(message)
+            
+            # Add to receiver's queue and wake it if it is waiting
+            self.message_queue[receiver].append(message)
+            self._conditions[receiver].notify_all()
         
         print(f"📨 MCP Message: {sender} → {receiver} | Type: {message_type} | Trace: {trace_id}")
         
         return trace_id
     
-    def receive_message(self, agent_name: str) -> Optional[MCPMessage]:
-        """Receive messages for specific agent"""
-        for i, message in enumerate(self.message_queue):
-            if message.receiver == agent_name:
-                # Remove and return the message
-                return self.message_queue.pop(i)
-        return None
+    def receive_message(self, agent_name: str, timeout: Optional[float] = 0, trace_id: Optional[str] = None) -> Optional[MCPMessage]:
+        """Receive messages for specific agent, waiting up to timeout seconds (None waits forever).
+        
+        With trace_id, only a message from that trace is taken, so concurrent
+        requests handled by the same agent do not pick up each other's messages.
+        """
+        def find_message():
+            for message in queue:
+                if trace_id is None or message.trace_id == trace_id:
+                    return message
+            return None
+        
+        with self._lock:
+            queue = self.message_queue[agent_name]
+            message = self._conditions[agent_name].wait_for(find_message, timeout=timeout)
+            if message is None:
+                return None
+            if queue[0] is message:
+                queue.popleft()
+            else:
+                queue.remove(message)
+            return message
     
     def get_message_history(self, trace_id: Optional[str] = None) -> List[MCPMessage]:
         """Get message history for debugging"""
         if trace_id:
             return [msg for msg in self.message_history if msg.trace_id == trace_id]
-        return self.message_history
+        return list(self.message_history)
     
     def clear_queue(self):
         """Clear message queue"""
-        self.message_queue.clear()
+        with self._lock:
+            for queue in self.message_queue.values():
+                queue.clear()
 
 # Global MCP instance
 mcp = MCPProtocol() 
@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+from typing import List
+import numpy as np
+from transformers import AutoTokenizer
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+# Where exported and quantized models are kept between runs
+ONNX_CACHE_DIR = Path(os.environ.get("ONNX_CACHE_DIR", Path.home() / ".cache" / "agentic-rag" / "onnx"))
+
+class ONNXEmbedder:
+    """Int8-quantized ONNX Runtime drop-in for SentenceTransformer.encode on CPU"""
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", max_length: int = 256):
+        self.model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_id)
+        self.model = self._load_quantized_model()
+    
+    def _load_quantized_model(self) -> ORTModelForFeatureExtraction:
+        """Export and quantize the model once, then reuse the cached int8 graph"""
+        quantized_dir = ONNX_CACHE_DIR / self.model_id.replace("/", "--")
+        quantized_file = "model_quantized.onnx"
+        
+        if not (quantized_dir / quantized_file).exists():
+            print(f"🔄 Exporting {self.model_id} to ONNX with int8 quantization...")
+            model = ORTModelForFeatureExtraction.from_pretrained(self.model_id, export=True)
+            quantizer = ORTQuantizer.from_pretrained(model)
+            qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+            quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+        
+        return ORTModelForFeatureExtraction.from_pretrained(
+            quantized_dir,
+            file_name=quantized_file,
+            provider="CPUExecutionProvider"
+        )
+    
+    def encode(self, sentences: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Embed sentences with mean pooling, matching SentenceTransformer.encode"""
+        batches = []
+        
+        for start in range(0, len(sentences), batch_size):
+            inputs = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.model(**inputs).last_hidden_state
+            
+            # Mean pooling over non-padding tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(embeddings)
+        
+        if not batches:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        embeddings = np.concatenate(batches).astype(np.float32)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        """Size of the embedding vectors"""
+        return self.model.config.hidden_size
@@ -0,0 +1,74 @@
+import queue
+import threading
+import time
+from typing import Any, List, Optional
+import numpy as np
+
+class _PendingQuery:
+    """A query waiting for its embedding"""
+    __slots__ = ('query', 'done', 'embedding', 'error')
+    
+    def __init__(self, query: str):
+        self.query = query
+        self.done = threading.Event()
+        self.embedding: Optional[np.ndarray] = None
+        self.error: Optional[Exception] = None
+
+class QueryBatcher:
+    """Groups queries arriving within a short window into a single encode() call"""
+    
+    def __init__(self, model: Any, window: float = 0.005, max_batch_size: int = 32):
+        self.model = model
+        self.window = window  # Seconds to wait for more queries after the first
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[_PendingQuery]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="QueryBatcher", daemon=True)
+        self._worker.start()
+    
+    def encode(self, query: str) -> np.ndarray:
+        """Embed a single query, sharing the model call with concurrent queries"""
+        pending = _PendingQuery(query)
+        self._queue.put(pending)
+        pending.done.wait()
+        
+        if pending.error is not None:
+            raise pending.error
+        return pending.embedding
+    
+    def _collect_batch(self) -> List[_PendingQuery]:
+        """Block for one query, then gather any others that arrive within the window"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _run(self):
+        """Worker loop: embed each batch and wake up the waiting callers"""
+        while True:
+            batch = self._collect_batch()
+            
+            try:
+                embeddings = self.model.encode(
+                    [pending.query for pending in batch],
+                    batch_size=len(batch),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+                for pending, embedding in zip(batch, embeddings):
+                    pending.embedding = embedding[None, :]
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
@@ -1,55 +1,118 @@
 import faiss
 import numpy as np
-from typing import List, Dict, Any, Tuple
+import torch
+from typing import List, Dict, Any, Optional, Tuple
 from sentence_transformers import SentenceTransformer
+from core.query_batcher import QueryBatcher
+try:
+    from core.onnx_embedder import ONNXEmbedder
+except ImportError:  # optimum / onnxruntime not installed
+    ONNXEmbedder = None
 import json
 import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Below this many vectors an exact flat scan is cheaper than building an HNSW graph
+HNSW_MIN_VECTORS = 1000
+
+# Number of recent query embeddings kept for repeated questions
+QUERY_CACHE_SIZE = 1024
 
 class VectorStore:
     """FAISS-based vector store for semantic search"""
     
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
         """Initialize vector store with sentence transformer model"""
-        self.model = SentenceTransformer(model_name)
+        self.model = None
+        if torch.cuda.is_available():
+            # Half precision doubles matmul throughput on GPU
+            self.model = SentenceTransformer(model_name, device='cuda').half()
+        elif ONNXEmbedder is not None:
+            # Int8 ONNX Runtime is several times faster than PyTorch on CPU
+            try:
+                self.model = ONNXEmbedder(model_name)
+            except Exception as e:
+                # Export or quantization can fail offline or on a read-only cache
+                print(f"⚠️ ONNX embedder unavailable, using SentenceTransformer: {str(e)}")
+        if self.model is None:
+            self.model = SentenceTransformer(model_name)
+        self.query_batcher = QueryBatcher(self.model)  # Shares encode() calls between concurrent searches
         self.dimension = 384  # Dimension for all-MiniLM-L6-v2
-        self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+        self.index = self._create_index()  # Inner product for cosine similarity
         self.chunks = []  # Store actual text chunks
-        self.metadata = []  # Store metadata for each chunk
+        # Per-chunk metadata stored column-wise, indexed like self.chunks
+        self.filenames = np.empty(0, dtype=object)
+        self.chunk_ids = np.empty(0, dtype=np.int32)
+        self.doc_ids = np.empty(0, dtype=np.int32)
+        self.doc_metadata = []  # One entry per document, indexed by doc_ids
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()  # LRU of query embeddings
+        self._query_cache_lock = threading.Lock()
+        self._index_lock = threading.RLock()  # Ingestion may run alongside searches
+    
+    def _create_index(self, num_vectors: int = 0):
+        """Create a flat index for small corpora and an HNSW graph for large ones"""
+        if num_vectors < HNSW_MIN_VECTORS:
+            return faiss.IndexFlatIP(self.dimension)
+        
+        index = faiss.IndexHNSWFlat(self.dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        return index
         
     def add_documents(self, documents: List[Dict[str, Any]]):
         """Add documents to the vector store"""
         all_chunks = []
-        all_metadata = []
+        all_filenames = []
+        all_chunk_ids = []
+        all_doc_ids = []
+        new_doc_metadata = []
         
         for doc in documents:
-            filename = doc['filename']
             chunks = doc['chunks']
-            doc_metadata = doc['metadata']
+            if not chunks:
+                continue
             
-            for i, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                chunk_metadata = {
-                    'filename': filename,
-                    'chunk_id': i,
-                    'doc_metadata': doc_metadata,
-                    'chunk_text': chunk[:100] + "..." if len(chunk) > 100 else chunk
-                }
-                all_metadata.append(chunk_metadata)
+            doc_id = len(self.doc_metadata) + len(new_doc_metadata)
+            new_doc_metadata.append(doc['metadata'])
+            
+            all_chunks.extend(chunks)
+            all_filenames.extend([doc['filename']] * len(chunks))
+            all_chunk_ids.extend(range(len(chunks)))
+            all_doc_ids.extend([doc_id] * len(chunks))
         
         if all_chunks:
             # Generate embeddings
             print(f"🔄 Generating embeddings for {len(all_chunks)} chunks...")
-            embeddings = self.model.encode(all_chunks, convert_to_tensor=False)
-            
-            # Normalize embeddings for cosine similarity
-            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
-            
-            # Add to FAISS index
-            self.index.add(embeddings.astype('float32'))
+            # Normalize inside encode() for cosine similarity
+            embeddings = self.model.encode(
+                all_chunks,
+                batch_size=256,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype('float32')
             
-            # Store chunks and metadata
-            self.chunks.extend(all_chunks)
-            self.metadata.extend(all_metadata)
+            with self._index_lock:
+                # Switch to HNSW once the corpus outgrows the flat index
+                total = self.index.ntotal + len(embeddings)
+                if isinstance(self.index, faiss.IndexFlatIP) and total >= HNSW_MIN_VECTORS:
+                    existing = self.index.reconstruct_n(0, self.index.ntotal) if self.index.ntotal else None
+                    self.index = self._create_index(total)
+                    if existing is not None:
+                        self.index.add(existing)
+                
+                # Add to FAISS index
+                self.index.add(embeddings)
+                
+                # Store chunks and metadata
+                self.chunks.extend(all_chunks)
+                self.filenames = np.concatenate([self.filenames, np.array(all_filenames, dtype=object)])
+                self.chunk_ids = np.concatenate([self.chunk_ids, np.array(all_chunk_ids, dtype=np.int32)])
+                self.doc_ids = np.concatenate([self.doc_ids, np.array(all_doc_ids, dtype=np.int32)])
+                self.doc_metadata.extend(new_doc_metadata)
             
             print(f"✅ Added {len(all_chunks)} chunks to vector store")
     
@@ -58,25 +121,89 @@ class VectorStore:
         if self.index.ntotal == 0:
             return []
         
-        # Generate query embedding
-        query_embedding = self.model.encode([query], convert_to_tensor=False)
-        query_embedding = query_embedding / np.linalg.norm(query_embedding, axis=1, keepdims=True)
+        query_embedding = self.embed_query(query)
         
-        # Search in FAISS index
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        with self._index_lock:
+            # Search in FAISS index
+            scores, indices = self.index.search(query_embedding, top_k)
+            return self._format_results(scores[0], indices[0])
+    
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one encode() call and one FAISS search"""
+        if self.index.ntotal == 0 or not queries:
+            return [[] for _ in queries]
+        
+        query_embeddings = np.empty((len(queries), self.dimension), dtype='float32')
+        missing = []
+        with self._query_cache_lock:
+            for i, query in enumerate(queries):
+                cached = self._query_cache.get(query)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    query_embeddings[i] = cached[0]
         
+        if missing:
+            embeddings = self.model.encode(
+                [queries[i] for i in missing],
+                batch_size=32,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype('float32')
+            with self._query_cache_lock:
+                for i, embedding in zip(missing, embeddings):
+                    query_embeddings[i] = embedding
+                    self._query_cache[queries[i]] = embedding[None, :]
+                while len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+        
+        with self._index_lock:
+            scores, indices = self.index.search(query_embeddings, top_k)
+            return [self._format_results(row_scores, row_indices) for row_scores, row_indices in zip(scores, indices)]
+    
+    def _format_results(self, scores: np.ndarray, indices: np.ndarray) -> List[Dict[str, Any]]:
+        """Turn one row of FAISS output into result dicts"""
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.chunks):  # Valid index
+        for score, idx in zip(scores, indices):
+            if 0 <= idx < len(self.chunks):  # Valid index (HNSW pads with -1)
                 result = {
                     'chunk': self.chunks[idx],
-                    'metadata': self.metadata[idx],
+                    'metadata': self._chunk_metadata(idx),
                     'score': float(score)
                 }
                 results.append(result)
         
         return results
     
+    def _chunk_metadata(self, idx: int) -> Dict[str, Any]:
+        """Assemble the metadata dict for a single chunk"""
+        chunk = self.chunks[idx]
+        return {
+            'filename': self.filenames[idx],
+            'chunk_id': int(self.chunk_ids[idx]),
+            'doc_metadata': self.doc_metadata[self.doc_ids[idx]],
+            'chunk_text': chunk[:100] + "..." if len(chunk) > 100 else chunk
+        }
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query, reusing the cached vector for repeated questions"""
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+                return cached
+        
+        # Generate query embedding, normalized inside encode()
+        query_embedding = self.query_batcher.encode(query).astype('float32')
+        
+        with self._query_cache_lock:
+            self._query_cache[query] = query_embedding
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        
+        return query_embedding
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store"""
         return {
@@ -85,9 +212,95 @@ class VectorStore:
             'model': self.model.get_sentence_embedding_dimension()
         }
     
+    def save(self, directory: str, documents: List[Dict[str, Any]] = ()):
+        """Persist the index, chunks, metadata and ingestion summaries so a restart can skip re-embedding"""
+        os.makedirs(directory, exist_ok=True)
+        
+        # Write a complete snapshot next to the current one, then switch the
+        # CURRENT pointer atomically; a crash mid-save leaves the old snapshot live
+        snapshot = tempfile.mkdtemp(prefix="snapshot-", dir=directory)
+        pointer = os.path.join(directory, "CURRENT")
+        try:
+            with self._index_lock:
+                np.save(os.path.join(snapshot, "chunks.npy"), np.array(self.chunks, dtype=object))
+                np.save(os.path.join(snapshot, "filenames.npy"), self.filenames)
+                np.save(os.path.join(snapshot, "chunk_ids.npy"), self.chunk_ids)
+                np.save(os.path.join(snapshot, "doc_ids.npy"), self.doc_ids)
+                with open(os.path.join(snapshot, "doc_metadata.json"), 'w', encoding='utf-8') as f:
+                    json.dump(self.doc_metadata, f)
+                with open(os.path.join(snapshot, "documents.json"), 'w', encoding='utf-8') as f:
+                    json.dump(list(documents), f)
+                faiss.write_index(self.index, os.path.join(snapshot, "index.faiss"))
+                total = self.index.ntotal
+            
+            with open(pointer + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(os.path.basename(snapshot))
+            os.replace(pointer + ".tmp", pointer)
+        except Exception:
+            # Leave no partial snapshot behind; CURRENT still names the previous one
+            shutil.rmtree(snapshot, ignore_errors=True)
+            if os.path.exists(pointer + ".tmp"):
+                os.remove(pointer + ".tmp")
+            raise
+        
+        # Drop superseded snapshots
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if entry.startswith("snapshot-") and path != snapshot:
+                shutil.rmtree(path, ignore_errors=True)
+        
+        print(f"💾 Saved {total} chunks to {directory}")
+    
+    @staticmethod
+    def remove_saved(directory: str):
+        """Delete only the files save() writes, leaving anything else in directory alone"""
+        if not os.path.isdir(directory):
+            return
+        
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if entry.startswith("snapshot-") and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry in ("CURRENT", "CURRENT.tmp"):
+                os.remove(path)
+    
+    def load(self, directory: str) -> Optional[List[Dict[str, Any]]]:
+        """Load a store written by save() into memory, returning its ingestion summaries"""
+        pointer = os.path.join(directory, "CURRENT")
+        if not os.path.exists(pointer):
+            return None
+        
+        with open(pointer, 'r', encoding='utf-8') as f:
+            snapshot = os.path.join(directory, f.read().strip())
+        
+        index = faiss.read_index(os.path.join(snapshot, "index.faiss"))
+        chunks = np.load(os.path.join(snapshot, "chunks.npy"), allow_pickle=True).tolist()
+        filenames = np.load(os.path.join(snapshot, "filenames.npy"), allow_pickle=True)
+        chunk_ids = np.load(os.path.join(snapshot, "chunk_ids.npy"))
+        doc_ids = np.load(os.path.join(snapshot, "doc_ids.npy"))
+        with open(os.path.join(snapshot, "doc_metadata.json"), 'r', encoding='utf-8') as f:
+            doc_metadata = json.load(f)
+        with open(os.path.join(snapshot, "documents.json"), 'r', encoding='utf-8') as f:
+            documents = json.load(f)
+        
+        with self._index_lock:
+            self.index = index
+            self.chunks = chunks
+            self.filenames = filenames
+            self.chunk_ids = chunk_ids
+            self.doc_ids = doc_ids
+            self.doc_metadata = doc_metadata
+        
+        print(f"📂 Loaded {self.index.ntotal} chunks from {directory}")
+        return documents
+    
     def clear(self):
         """Clear the vector store"""
-        self.index = faiss.IndexFlatIP(self.dimension)
-        self.chunks = []
-        self.metadata = []
+        with self._index_lock:
+            self.index = self._create_index()
+            self.chunks = []
+            self.filenames = np.empty(0, dtype=object)
+            self.chunk_ids = np.empty(0, dtype=np.int32)
+            self.doc_ids = np.empty(0, dtype=np.int32)
+            self.doc_metadata = []
         print("🗑️ Vector store cleared") 
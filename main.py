@@ -1,5 +1,7 @@
 from typing import List, Dict, Any
 import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from agents.ingestion_agent import IngestionAgent
 from agents.retrieval_agent import RetrievalAgent
@@ -9,15 +11,21 @@ from core.mcp_protocol import mcp
 # Load environment variables
 load_dotenv()
 
+# Concurrent Gemini requests when answering a batch of questions
+LLM_WORKERS = 8
+
 class CoordinatorAgent:
     """Main coordinator that orchestrates all agents"""
     
     def __init__(self):
         self.name = "CoordinatorAgent"
         self.ingestion_agent = IngestionAgent()
-        self.retrieval_agent = RetrievalAgent()
+        self.retrieval_agent = RetrievalAgent(self.ingestion_agent)
         self.llm_agent = LLMResponseAgent()
-        self.documents_processed = False
+        # Resume from a saved vector store if one exists
+        self.documents_processed = self.retrieval_agent.load_vector_store()
+        # Bumped whenever the indexed documents change; shared by every UI session
+        self.corpus_version = 0
         
     def process_documents(self, file_paths: List[str]) -> bool:
         """Process documents through the agent pipeline"""
@@ -32,9 +40,11 @@ class CoordinatorAgent:
             
             # Step 2: Retrieval Agent builds vector store
             success = self.retrieval_agent.process_ingestion_message(trace_id)
+            self._take_reply(trace_id)
             
             if success:
                 self.documents_processed = True
+                self.corpus_version += 1
                 print(f"✅ {self.name}: Document processing pipeline completed successfully")
                 return True
             else:
@@ -45,6 +55,10 @@ class CoordinatorAgent:
             print(f"❌ {self.name}: Error in document processing: {str(e)}")
             return False
     
+    def save_state(self):
+        """Persist the vector store, e.g. once a run of ingestion batches is done"""
+        self.retrieval_agent.save_vector_store()
+    
     def answer_question(self, query: str) -> Dict[str, Any]:
         """Answer user question using the agent pipeline"""
         if not self.documents_processed:
@@ -65,6 +79,7 @@ class CoordinatorAgent:
             
             # Step 2: LLM Agent generates response
             response = self.llm_agent.generate_response(query, trace_id)
+            self._take_reply(trace_id)
             
             print(f"✅ {self.name}: Question answered successfully")
             return response
@@ -77,6 +92,50 @@ class CoordinatorAgent:
                 "error": str(e)
             }
     
+    def answer_questions(self, queries: List[str]) -> List[Dict[str, Any]]:
+        """Answer several questions with one batched search and concurrent LLM calls"""
+        if len(queries) == 1:
+            return [self.answer_question(queries[0])]
+        
+        if not self.documents_processed:
+            return [self.answer_question(query) for query in queries]
+        
+        print(f"🤔 {self.name}: Processing {len(queries)} questions")
+        
+        trace_ids = [mcp.generate_trace_id() for _ in queries]
+        
+        try:
+            # Step 1: Retrieval Agent searches for all questions at once
+            self.retrieval_agent.search_documents_batch(queries, top_k=5, trace_ids=trace_ids)
+            
+            # Step 2: LLM calls are network-bound, so run them side by side
+            with ThreadPoolExecutor(max_workers=min(LLM_WORKERS, len(queries))) as pool:
+                responses = list(pool.map(self.llm_agent.generate_response, queries, trace_ids))
+            for trace_id in trace_ids:
+                self._take_reply(trace_id)
+            
+            print(f"✅ {self.name}: {len(queries)} questions answered")
+            return responses
+            
+        except Exception as e:
+            print(f"❌ {self.name}: Error answering questions: {str(e)}")
+            return [
+                {
+                    "answer": f"I encountered an error while processing your question: {str(e)}",
+                    "sources": [],
+                    "error": str(e)
+                }
+                for _ in queries
+            ]
+    
+    def _take_reply(self, trace_id: str):
+        """Consume an agent's reply for this trace so its payload is not kept queued"""
+        mcp.receive_message(self.name, trace_id=trace_id)
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Normalized query embedding, e.g. for semantic answer caching"""
+        return self.retrieval_agent.embed_query(query)
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Get overall system status"""
         return {
@@ -90,7 +149,9 @@ class CoordinatorAgent:
         """Clear all processed data"""
         self.retrieval_agent.clear_vector_store()
         self.ingestion_agent.processed_documents = []
+        self.ingestion_agent.batches.clear()
         self.documents_processed = False
+        self.corpus_version += 1
         mcp.clear_queue()
         print(f"🗑️ {self.name}: System cleared")
     
@@ -98,10 +159,13 @@ class CoordinatorAgent:
         """Test LLM connection"""
         return self.llm_agent.test_connection()
 
-# Global coordinator instance
-coordinator = CoordinatorAgent()
+def build_coordinator() -> CoordinatorAgent:
+    """Create a coordinator with its agents, models and vector store"""
+    return CoordinatorAgent()
 
 if __name__ == "__main__":
+    coordinator = build_coordinator()
+    
     print("🤖 Agentic RAG Chatbot Coordinator")
     print("Testing LLM connection...")
     
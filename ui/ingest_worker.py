@@ -0,0 +1,75 @@
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+class IngestWorker:
+    """Background thread that feeds queued files to the coordinator in batches"""
+    
+    BATCH_SIZE = 16
+    
+    def __init__(self, coordinator: Any, batch_size: int = BATCH_SIZE):
+        self.coordinator = coordinator
+        self.batch_size = batch_size
+        self.in_q: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+        self.counter = {'processed': 0, 'failed': 0, 'total': 0, 'started_at': None}
+    
+    def submit(self, file_paths: List[str]):
+        """Queue files for ingestion, starting a new progress run when idle"""
+        with self._lock:
+            if self.counter['processed'] >= self.counter['total']:
+                self.counter = {'processed': 0, 'failed': 0, 'total': 0, 'started_at': time.monotonic()}
+            self.counter['total'] += len(file_paths)
+        
+        for file_path in file_paths:
+            self.in_q.put(file_path)
+    
+    def progress(self) -> Dict[str, Any]:
+        """Snapshot of the current run with throughput and ETA"""
+        with self._lock:
+            counter = dict(self.counter)
+        
+        done, total = counter['processed'], counter['total']
+        elapsed = time.monotonic() - counter['started_at'] if counter['started_at'] else 0.0
+        rate = done / elapsed * 60 if elapsed > 0 else 0.0  # Files per minute
+        eta = (total - done) / rate * 60 if rate > 0 else None
+        
+        return {
+            'busy': done < total,
+            'processed': done,
+            'failed': counter['failed'],
+            'total': total,
+            'rate': rate,
+            'eta': eta
+        }
+    
+    def _next_batch(self) -> List[str]:
+        """Block for one file, then take whatever else is already queued"""
+        batch = [self.in_q.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.in_q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def run(self):
+        """Worker loop: run each batch through the agent pipeline"""
+        while True:
+            batch = self._next_batch()
+            
+            try:
+                success = self.coordinator.process_documents(batch)
+            except Exception as e:
+                print(f"❌ IngestWorker: Error processing batch: {str(e)}")
+                success = False
+            
+            # Persist once the queue drains rather than rewriting the store after every batch
+            if self.in_q.empty():
+                self.coordinator.save_state()
+            
+            with self._lock:
+                self.counter['processed'] += len(batch)
+                if not success:
+                    self.counter['failed'] += len(batch)
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+class QueryCache:
+    """Thread-safe LRU cache with per-entry expiry for answers, matching paraphrases by embedding"""
+    
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 600, similarity_threshold: float = 0.92):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # (version, query) -> (expires_at, value, slot)
+        self._entries: "OrderedDict[Tuple[Hashable, str], tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Query embeddings live in a fixed matrix; each cached entry owns one row
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[Tuple[Hashable, str]]] = [None] * max_size
+        self._slot_versions = np.full(max_size, -1, dtype=np.int64)
+        self._free_slots = list(range(max_size - 1, -1, -1))
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, query: str, version: int, embed: Optional[Callable[[], np.ndarray]] = None) -> Optional[Any]:
+        """Return the cached value for this query and version, falling back to the closest embed() match"""
+        key = (version, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._evict(key)
+                entry = None
+            
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            
+            semantic = embed is not None and self._matrix is not None
+        
+        # Embed outside the lock so a model call does not stall other sessions' lookups
+        embedding = embed() if semantic else None
+        
+        with self._lock:
+            if embedding is not None:
+                key = self._nearest(version, embedding)
+                entry = self._entries.get(key) if key is not None else None
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.semantic_hits += 1
+            return entry[1]
+    
+    def put(self, query: str, version: int, value: Any, embedding: Optional[np.ndarray] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            key = (version, query)
+            if key in self._entries:
+                self._evict(key, count=False)
+            while len(self._entries) >= self.max_size:
+                self._evict(next(iter(self._entries)))
+            
+            slot = self._free_slots.pop()
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._matrix[slot] = vector
+                self._slot_versions[slot] = version
+            self._slot_keys[slot] = key
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, slot)
+    
+    def _nearest(self, version: int, embedding: np.ndarray) -> Optional[Tuple[Hashable, str]]:
+        """Key of the most similar live entry for this version, if above the threshold"""
+        if self._matrix is None:
+            return None
+        
+        # One matrix-vector product scores every cached query at once
+        scores = self._matrix @ np.asarray(embedding, dtype=np.float32).reshape(-1)
+        scores[self._slot_versions != version] = -np.inf
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.similarity_threshold:
+            return None
+        
+        key = self._slot_keys[slot]
+        if self._entries[key][0] < time.monotonic():
+            self._evict(key)
+            return None
+        return key
+    
+    def _evict(self, key: Tuple[Hashable, str], count: bool = True):
+        """Remove an entry and release its embedding row"""
+        _, _, slot = self._entries.pop(key)
+        self._slot_keys[slot] = None
+        self._slot_versions[slot] = -1
+        self._free_slots.append(slot)
+        if count:
+            self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._slot_keys = [None] * self.max_size
+            self._slot_versions[:] = -1
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
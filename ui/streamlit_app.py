@@ -1,13 +1,18 @@
 import streamlit as st
 import os
 import sys
+import shutil
 from pathlib import Path
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path to import modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from main import coordinator
+from ui.query_cache import QueryCache
+from ui.ingest_worker import IngestWorker
 
 # Page config
 st.set_page_config(
@@ -17,37 +22,167 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Oldest chat turns are dropped once a session holds this many
+CHAT_HISTORY_MAX = int(os.environ.get("CHAT_HISTORY_MAX", 200))
+
 # Initialize session state
 if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
-if 'documents_uploaded' not in st.session_state:
-    st.session_state.documents_uploaded = False
+    st.session_state.chat_history = deque(maxlen=CHAT_HISTORY_MAX)
 if 'processing' not in st.session_state:
     st.session_state.processing = False
 
-def save_uploaded_file(uploaded_file):
-    """Save uploaded file to uploads directory"""
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
+@st.cache_resource(show_spinner="Loading models…")
+def get_coordinator():
+    """Single coordinator (models and FAISS index) shared across reruns and sessions"""
+    # Heavy ML imports are deferred until here so the page can paint first
+    import torch
+    torch.set_num_threads(min(4, os.cpu_count() or 1))
     
-    file_path = upload_dir / uploaded_file.name
+    import main
+    return main.build_coordinator()
+
+@st.cache_resource
+def get_query_cache():
+    """Answer cache shared across reruns and sessions"""
+    return QueryCache(max_size=1024, ttl_seconds=600, similarity_threshold=0.92)
+
+@st.cache_resource
+def get_ingest_worker():
+    """Single background ingestion thread shared across reruns"""
+    worker = IngestWorker(get_coordinator())
+    threading.Thread(target=worker.run, name="IngestWorker", daemon=True).start()
+    return worker
+
+UPLOAD_DIR = Path("uploads")
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+# Opt-in fsync after each upload, only worth it on rotating media
+UPLOAD_FSYNC = os.environ.get("UPLOAD_FSYNC", "0") == "1"
+
+# Files written concurrently when several are uploaded at once
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", 4))
+
+# Uploads at least this large skip the chunked copy loop
+LARGE_UPLOAD_BYTES = 32 * 1024 * 1024
+
+# Most recent chat turns rendered on every run; older ones only when the user asks
+MAX_LIVE_TURNS = 10
+
+# Resubmitting the questions just answered within this many seconds is ignored
+SUBMIT_DEBOUNCE_SECONDS = 0.8
+
+@st.cache_data(ttl=5, show_spinner=False)
+def fetch_system_status(corpus_version):
+    """System status, refreshed at most every 5 seconds or when the corpus changes"""
+    return get_coordinator().get_system_status()
+
+def save_uploaded_file(uploaded_file):
+    """Write uploaded file to the uploads directory, in 1 MiB chunks unless it is large"""
+    file_path = UPLOAD_DIR / uploaded_file.name
+    uploaded_file.seek(0)
     with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        if uploaded_file.size >= LARGE_UPLOAD_BYTES:
+            # Uploads are held in memory; hand the whole buffer to write() without slicing copies
+            f.write(uploaded_file.getbuffer())
+        else:
+            shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
+        if UPLOAD_FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
     
     return str(file_path)
 
 def display_sources(sources):
-    """Display source information without nested expanders"""
-    if sources:
-        for i, source in enumerate(sources):
-            st.markdown(f"**Source {i+1}:** `{source['filename']}`")
-            st.markdown(f"> {source['preview']}")
-            st.markdown("---")
+    """Display source information as a single markdown element"""
+    if not sources:
+        return
+    
+    # Quote every line so headings or code fences in one preview stay inside its own blockquote
+    parts = [
+        f"**Source {i+1}:** `{source['filename']}`\n\n> " + source['preview'].replace("\n", "\n> ") + "\n\n---"
+        for i, source in enumerate(sources)
+    ]
+    st.markdown("\n".join(parts))
+
+def record_turns(questions, answers):
+    """Append answered questions to the chat history and note when they completed"""
+    st.session_state.chat_history.extend(
+        (question, answers[question][0], answers[question][1]) for question in questions
+    )
+    st.session_state._last_answered = (questions, time.monotonic())
+
+def render_turn(question, answer, sources):
+    """Render one question/answer pair as chat messages"""
+    with st.chat_message("user"):
+        st.write(question)
+    with st.chat_message("assistant"):
+        st.write(answer)
+        display_sources(sources)
+
+_ARCH_MD = """
+**Agent Flow:**
+1. 🔄 **IngestionAgent**
+   - Parses documents
+   - Creates text chunks
+
+2. 🔍 **RetrievalAgent** 
+   - Builds vector store
+   - Performs semantic search
+
+3. 🤖 **LLMResponseAgent**
+   - Uses Gemini 2.0 Flash or Hugging Face LLM
+   - Generates contextual answers
+
+**MCP Protocol:**
+- Structured message passing
+- Trace ID tracking
+- Agent coordination
+"""
+
+_SYS_INFO = {
+    "Model": "HuggingFace: flan-t5-base",
+    "Vector Store": "FAISS",
+    "Embeddings": "SentenceTransformers",
+    "Supported Formats": ["PDF", "PPTX", "DOCX", "CSV", "TXT", "MD"]
+}
+
+def render_architecture():
+    """Static architecture panel built from the precomputed module constants"""
+    st.header("🔍 Agent Architecture")
+    st.markdown(_ARCH_MD)
+    
+    st.header("ℹ️ System Info")
+    st.json(_SYS_INFO)
 
 def main():
     st.title("🤖 Agentic RAG Chatbot")
     st.markdown("### Multi-Format Document QA with Model Context Protocol")
     
+    # Paint everything that does not need the models first, so a cold
+    # start shows the uploader, chat history and static panel right away
+    col1, col2 = st.columns([3, 1])
+    
+    with col2:
+        render_architecture()
+    
+    with col1:
+        st.header("💬 Chat Interface")
+        
+        history = list(st.session_state.chat_history)
+        earlier, live = history[:-MAX_LIVE_TURNS], history[-MAX_LIVE_TURNS:]
+        
+        # New turns are written into this container in place, without a rerun
+        chat_container = st.container()
+        with chat_container:
+            # An expander still builds and sends its contents, so older turns are
+            # only rendered once the user switches them on
+            if earlier and st.toggle(f"Show {len(earlier)} earlier turns", key="show_earlier_turns"):
+                for question, answer, sources in earlier:
+                    render_turn(question, answer, sources)
+            
+            for question, answer, sources in live:
+                render_turn(question, answer, sources)
+    
     # Sidebar for document upload and system status
     with st.sidebar:
         st.header("📁 Document Upload")
@@ -58,31 +193,45 @@ def main():
             accept_multiple_files=True,
             help="Supported formats: PDF, PPTX, DOCX, CSV, TXT, MD"
         )
-        
+    
+    coordinator = get_coordinator()
+    query_cache = get_query_cache()
+    ingest_worker = get_ingest_worker()
+    
+    with st.sidebar:
         if uploaded_files and not st.session_state.processing:
             if st.button("🚀 Process Documents", type="primary"):
+                with st.spinner("Saving documents..."):
+                    if len(uploaded_files) == 1:
+                        file_paths = [save_uploaded_file(uploaded_files[0])]
+                    else:
+                        # Disk writes release the GIL, so overlap them across files
+                        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(uploaded_files))) as pool:
+                            file_paths = list(pool.map(save_uploaded_file, uploaded_files))
+                    st.success(f"Saved {len(file_paths)} files")
+                
+                # Parsing and embedding run on the background worker; the UI only polls progress
+                ingest_worker.submit(file_paths)
                 st.session_state.processing = True
+                st.rerun()
+        
+        if st.session_state.processing:
+            progress = ingest_worker.progress()
+            
+            if progress['busy']:
+                eta = f"{progress['eta']:.0f}s" if progress['eta'] is not None else "estimating..."
+                st.progress(progress['processed'] / progress['total'])
+                st.caption(f"{progress['processed']}/{progress['total']} — ETA {eta} @ {progress['rate']:.1f}/min")
+            else:
+                st.session_state.processing = False
                 
-                with st.spinner("Processing documents..."):
-                    file_paths = []
-                    for uploaded_file in uploaded_files:
-                        file_path = save_uploaded_file(uploaded_file)
-                        file_paths.append(file_path)
-                        st.success(f"Saved: {uploaded_file.name}")
-                    
-                    success = coordinator.process_documents(file_paths)
-                    
-                    if success:
-                        st.session_state.documents_uploaded = True
-                        st.session_state.processing = False
-                        st.success("✅ Documents processed successfully!")
-                        st.rerun()
-                    else:
-                        st.session_state.processing = False
-                        st.error("❌ Failed to process documents")
+                if progress['failed'] < progress['total']:
+                    st.success("✅ Documents processed successfully!")
+                else:
+                    st.error("❌ Failed to process documents")
         
         st.header("🔧 System Status")
-        status = coordinator.get_system_status()
+        status = fetch_system_status(coordinator.corpus_version)
         
         if status['documents_processed']:
             st.success("✅ System Ready")
@@ -98,82 +247,88 @@ def main():
                 st.subheader("📊 Document Formats")
                 for fmt, count in ingestion_stats['formats_processed'].items():
                     st.text(f"{fmt.upper()}: {count}")
+            
+            cache_stats = query_cache.stats()
+            st.subheader("⚡ Query Cache")
+            st.text(f"Hits: {cache_stats['hits']} ({cache_stats['semantic_hits']} semantic) | Misses: {cache_stats['misses']}")
+            st.text(f"Entries: {cache_stats['size']} | Evictions: {cache_stats['evictions']}")
         else:
             st.warning("⏳ Upload documents to get started")
         
         if st.button("🗑️ Clear System"):
             coordinator.clear_system()
-            st.session_state.documents_uploaded = False
-            st.session_state.chat_history = []
+            st.session_state.chat_history.clear()
             st.success("System cleared!")
             st.rerun()
     
-    col1, col2 = st.columns([3, 1])
-    
     with col1:
-        st.header("💬 Chat Interface")
-        
-        for i, (question, answer, sources) in enumerate(st.session_state.chat_history):
-            st.markdown(f"**You:** {question}")
-            st.markdown(f"**Assistant:** {answer}")
-            
-            if sources:
-                display_sources(sources)
-            
-            st.divider()
-        
-        if st.session_state.documents_uploaded:
+        if status['documents_processed']:
             with st.form("query_form"):
-                query = st.text_input(
-                    "Ask a question about your documents:",
+                query = st.text_area(
+                    "Ask questions about your documents (one per line):",
                     placeholder="What are the key findings in the uploaded documents?"
                 )
                 submit_button = st.form_submit_button("Ask Question", type="primary")
+                questions = [line.strip() for line in query.splitlines() if line.strip()]
+                
+                # Drop empty submissions and repeats of the questions that were just answered.
+                # A second Enter stops the running script, so the repeat arrives only once
+                # the first answers are in; compare against their completion time.
+                accepted = False
+                if submit_button:
+                    last_questions, last_answered = st.session_state.get('_last_answered', ([], 0.0))
+                    if not questions:
+                        st.toast("⚠️ Please enter a question")
+                    elif questions != last_questions or time.monotonic() - last_answered >= SUBMIT_DEBOUNCE_SECONDS:
+                        accepted = True
                 
-                if submit_button and query.strip():
-                    with st.spinner("Generating answer..."):
-                        response = coordinator.answer_question(query.strip())
-                        
-                        st.session_state.chat_history.append((
-                            query.strip(), 
-                            response['answer'], 
-                            response.get('sources', [])
-                        ))
-                        
-                        st.rerun()
+                if accepted:
+                    version = coordinator.corpus_version
+                    answers = {}
+                    
+                    for question in questions:
+                        cached = query_cache.get(
+                            question.lower(),
+                            version,
+                            # Embed the exact text answer_questions() searches with, so the
+                            # vector store's query cache serves the search without re-encoding
+                            embed=lambda q=question: coordinator.embed_query(q)
+                        )
+                        if cached is not None:
+                            answers[question] = cached
+                    
+                    # Answer all uncached questions in one batched round trip
+                    pending = list(dict.fromkeys(q for q in questions if q not in answers))
+                    if pending:
+                        with st.spinner("Generating answer..."):
+                            responses = coordinator.answer_questions(pending)
+                            
+                            for question, response in zip(pending, responses):
+                                answers[question] = (response['answer'], response.get('sources', []))
+                                if 'error' not in response:
+                                    query_cache.put(
+                                        question.lower(),
+                                        version,
+                                        answers[question],
+                                        embedding=coordinator.embed_query(question)
+                                    )
+                            
+                            # Record before the spinner closes: a run superseded by a
+                            # resubmit is stopped at its next element update
+                            record_turns(questions, answers)
+                    else:
+                        record_turns(questions, answers)
+                    
+                    with chat_container:
+                        for question in questions:
+                            render_turn(question, *answers[question])
         else:
             st.info("📤 Please upload and process documents first to start asking questions.")
     
-    with col2:
-        st.header("🔍 Agent Architecture")
-        
-        st.markdown("""
-        **Agent Flow:**
-        1. 🔄 **IngestionAgent**
-           - Parses documents
-           - Creates text chunks
-        
-        2. 🔍 **RetrievalAgent** 
-           - Builds vector store
-           - Performs semantic search
-        
-        3. 🤖 **LLMResponseAgent**
-           - Uses Gemini 2.0 Flash or Hugging Face LLM
-           - Generates contextual answers
-        
-        **MCP Protocol:**
-        - Structured message passing
-        - Trace ID tracking
-        - Agent coordination
-        """)
-        
-        st.header("ℹ️ System Info")
-        st.json({
-            "Model": "HuggingFace: flan-t5-base",
-            "Vector Store": "FAISS",
-            "Embeddings": "SentenceTransformers",
-            "Supported Formats": ["PDF", "PPTX", "DOCX", "CSV", "TXT", "MD"]
-        })
+    # Poll the ingestion worker until the queued documents are done
+    if st.session_state.processing:
+        time.sleep(2)
+        st.rerun()
 
 if __name__ == "__main__":
     main()